@@ -2,21 +2,38 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import hashlib
+import json
 import os
+import sqlite3
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import numpy as np
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 from matplotlib.projections.polar import PolarAxes
 import networkx as nx
-from scipy.spatial import distance_matrix
+from scipy.spatial.distance import pdist, squareform
 from astropy.coordinates import SkyCoord, EarthLocation, AltAz  # type: ignore
+from astropy.coordinates.erfa_astrom import erfa_astrom, ErfaAstromInterpolator  # type: ignore
 from astropy.time import Time  # type: ignore
 from astropy import units as u  # type: ignore
 from typing import cast
 import datetime
 
+# Directory for data cached between runs (e.g. resolved celestial names).
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "celestsp"
+)
+# How long (in seconds) a location obtained from ip-api.com is reused.
+LOCATION_CACHE_TTL = 6 * 60 * 60
+# How many parsed input files are kept; the least recently written are removed.
+INPUT_CACHE_MAX_ENTRIES = 32
+
 
 class CelestialTSP:
     def __init__(self, args: argparse.Namespace):
@@ -30,6 +47,15 @@ class CelestialTSP:
             self.observation_time = (
                 Time(f"{args.date} {args.time}") - int(args.tz) * u.hour
             )
+        # The horizontal frame at the observation time, shared by all transforms.
+        self.altaz_frame = AltAz(obstime=self.observation_time, location=self.location)
+        # A time grid (1000 steps within 24h) and a frame whose obstime is the
+        # grid as a single (1, 1000) Time array, used to compute when bodies set.
+        self.time_grid = np.linspace(0, 24, 1000) * u.hour
+        self.time_grid_frame = AltAz(
+            obstime=(self.observation_time + self.time_grid)[None, :],
+            location=self.location,
+        )
         self.df: pd.DataFrame = pd.DataFrame()
 
     def run(self):
@@ -52,13 +78,13 @@ class CelestialTSP:
             f"Observation Date/Time: {self.args.date} {self.args.time} {self.args.tz}"
         )
 
-        # 3. Build a graph for all celestial bodies:
-        # We use their (Altitude, Azimuth) values.
-        coordinates = self.df[["Altitude", "Azimuth"]].to_numpy()
-        dmatrix = distance_matrix(coordinates, coordinates)
+        # 3. Compute the distances between all celestial bodies:
+        # We use the great-circle distances between their (Altitude, Azimuth) values,
+        # which satisfy the triangle inequality required by Christofides.
+        coordinates = self.df[["Altitude", "Azimuth"]].to_numpy(dtype=np.float32)
+        dmatrix = self.angular_distance_matrix(coordinates[:, 0], coordinates[:, 1])
         if first_index != -1:
-            graph = self.make_graph(coordinates, dmatrix)
-            tsp_path = nx.approximation.greedy_tsp(graph, source=first_index)
+            tsp_path = self.solve_tsp(dmatrix, first_index)
             df_ordered = self.df.iloc[tsp_path].reset_index(drop=True)
             self.show_results(df_ordered)
             self.save_spherical_image(
@@ -72,30 +98,204 @@ class CelestialTSP:
     def read_celestial_names(self, file_path: str) -> pd.DataFrame:
         """
         Reads a file with celestial object names and retrieves their RA/Dec using astropy.
+        The result is cached under CACHE_DIR/inputs until the file changes.
         Exits with error if file cannot be found or no valid data is returned.
         """
         if not os.path.exists(file_path):
             print(f"Input file {file_path} does not exist.")
             sys.exit(1)
 
-        records = []
+        # Reuse the result of a previous run if the file has not changed since.
+        # The file is identified by its modification time and size taken before
+        # reading it, so an edit made while the names are looked up is detected.
+        cache_path = os.path.join(
+            CACHE_DIR,
+            "inputs",
+            hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest() + ".json",
+        )
+        stat = os.stat(file_path)
+        signature = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        cached_df = self._load_input_cache(cache_path, signature)
+        if cached_df is not None:
+            return cached_df
+
         with open(file_path, "r") as f:
-            for line in f:
-                name = line.strip()
-                try:
-                    coord = SkyCoord.from_name(name)
-                    records.append(
-                        {"Name": name, "RA": coord.ra.deg, "Dec": coord.dec.deg}
-                    )
-                except Exception as e:
-                    print(f"Error looking up {name}: {e}")
-                    continue
-        df = pd.DataFrame(records)
+            names = [line.strip() for line in f]
+
+        # Fill preallocated arrays with one row per input line.
+        results = self.lookup_names(names)
+        coordinates = np.empty((len(names), 2), dtype=np.float32)
+        found = np.zeros(len(names), dtype=bool)
+        for i, (name, result) in enumerate(zip(names, results)):
+            if isinstance(result, Exception):
+                print(f"Error looking up {name}: {result}")
+                continue
+            coordinates[i] = result
+            found[i] = True
+        names_array = np.array(names, dtype=object)
+        # Failed lookups leave gaps, which the boolean mask drops (copying the
+        # remaining rows). When every name resolved, the arrays are used as they are.
+        if not found.all():
+            names_array, coordinates = names_array[found], coordinates[found]
+        df = pd.DataFrame(
+            {
+                "Name": names_array,
+                "RA": coordinates[:, 0],
+                "Dec": coordinates[:, 1],
+            },
+            copy=False,
+        )
         if df.empty:
             print("Input file is empty or contains no valid celestial names.")
             sys.exit(1)
+        # Only cache complete results, so that failed lookups are retried next time.
+        if found.all():
+            self._save_input_cache(cache_path, signature, df)
         return df
 
+    @staticmethod
+    def _load_input_cache(cache_path: str, signature: dict) -> pd.DataFrame | None:
+        """
+        Return the DataFrame cached for an input file with the given signature.
+        Returns None if there is no entry, it is stale, or it cannot be read.
+        """
+        try:
+            with open(cache_path, "r") as f:
+                cached = json.load(f)
+            if any(cached[key] != value for key, value in signature.items()):
+                return None
+            names, ra, dec = cached["names"], cached["ra"], cached["dec"]
+            if not (
+                isinstance(names, list)
+                and isinstance(ra, list)
+                and isinstance(dec, list)
+                and 0 < len(names) == len(ra) == len(dec)
+                and all(isinstance(name, str) for name in names)
+            ):
+                return None
+            return pd.DataFrame(
+                {
+                    "Name": np.array(names, dtype=object),
+                    "RA": np.array(ra, dtype=np.float32),
+                    "Dec": np.array(dec, dtype=np.float32),
+                },
+                copy=False,
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @staticmethod
+    def _save_input_cache(cache_path: str, signature: dict, df: pd.DataFrame) -> None:
+        """
+        Cache the DataFrame of an input file as plain JSON, keeping at most
+        INPUT_CACHE_MAX_ENTRIES files by removing the least recently written.
+        """
+        cache_dir = os.path.dirname(cache_path)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_path, "w") as f:
+                json.dump(
+                    {
+                        **signature,
+                        "names": df["Name"].tolist(),
+                        "ra": df["RA"].tolist(),
+                        "dec": df["Dec"].tolist(),
+                    },
+                    f,
+                )
+            entries = [
+                os.path.join(cache_dir, entry)
+                for entry in os.listdir(cache_dir)
+                if entry.endswith(".json")
+            ]
+            entries.sort(key=os.path.getmtime, reverse=True)
+            for entry in entries[INPUT_CACHE_MAX_ENTRIES:]:
+                os.remove(entry)
+        except OSError:
+            pass
+
+    @classmethod
+    def lookup_names(cls, names: list[str]) -> list[tuple[float, float] | Exception]:
+        """
+        Resolves celestial names to (RA, Dec) in degrees, in the order given.
+        Entries that are already numeric "RA Dec" pairs are used as they are.
+        Names already resolved on a previous run are read from an on-disk cache;
+        the remaining ones are queried in parallel. A failed lookup is returned as
+        the exception it raised.
+        """
+        results: dict[str, tuple[float, float] | Exception] = {}
+        for name in set(names):
+            coordinates = cls._parse_coordinates(name)
+            if coordinates is not None:
+                results[name] = coordinates
+
+        conn = cls._open_name_cache()
+        if conn is not None:
+            for name in set(names).difference(results):
+                row = conn.execute(
+                    "SELECT ra, dec FROM names WHERE name = ?", (name,)
+                ).fetchone()
+                if row is not None:
+                    results[name] = (row[0], row[1])
+
+        missing = [name for name in dict.fromkeys(names) if name not in results]
+        if missing:
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                results.update(zip(missing, executor.map(cls._resolve_name, missing)))
+
+        if conn is not None:
+            rows = []
+            for name in missing:
+                result = results[name]
+                if not isinstance(result, Exception):
+                    rows.append((name, *result))
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO names (name, ra, dec) VALUES (?, ?, ?)",
+                        rows,
+                    )
+            except sqlite3.Error:
+                pass
+            conn.close()
+        return [results[name] for name in names]
+
+    @staticmethod
+    def _parse_coordinates(name: str) -> tuple[float, float] | None:
+        """Parse "RA Dec" (in degrees, space or comma separated), or return None."""
+        parts = name.replace(",", " ").split()
+        if len(parts) != 2:
+            return None
+        try:
+            ra, dec = float(parts[0]), float(parts[1])
+        except ValueError:
+            return None
+        if not (0 <= ra < 360 and -90 <= dec <= 90):
+            return None
+        return ra, dec
+
+    @staticmethod
+    def _resolve_name(name: str) -> tuple[float, float] | Exception:
+        """Look up a single name with astropy, returning the exception on failure."""
+        try:
+            coord = SkyCoord.from_name(name)
+            return float(coord.ra.deg), float(coord.dec.deg)
+        except Exception as e:
+            return e
+
+    @staticmethod
+    def _open_name_cache() -> sqlite3.Connection | None:
+        """Open the name cache in CACHE_DIR, or return None if it is unavailable."""
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(CACHE_DIR, "names.sqlite"))
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS names (name TEXT PRIMARY KEY, ra REAL, dec REAL)"
+            )
+            return conn
+        except (OSError, sqlite3.Error):
+            return None
+
     def find_first_body(self) -> int:
         """
         Identify the celestial body that will set first (i.e. has the shortest time until setting)
@@ -103,64 +303,80 @@ class CelestialTSP:
         The method also adds several columns to self.df: Altitude, Azimuth, TimeToSet, Observable.
         Returns the row index of this first body.
         """
-        altaz_frame = AltAz(obstime=self.observation_time, location=self.location)
-
-        # Pre-create lists (can be replaced with vectorized operations if desired)
-        altitudes = []
-        azimuths = []
-        times_to_set = []
-        observables = []
-        shortest_time = np.inf
-        first_index = -1
-
-        # For each row we can optimize by processing in bulk. However, because the time-to-set
-        # calculation uses a simulated time grid, we loop for clarity.
-        for i, row in self.df.iterrows():
-            sky_coord = SkyCoord(ra=row["RA"], dec=row["Dec"], unit="deg")
-            altaz = sky_coord.transform_to(altaz_frame)
-            alt = altaz.alt.deg
-            az = altaz.az.deg
-            altitudes.append(alt)
-            azimuths.append(az)
-            observables.append(self.is_observable(altaz))
-
-            # If object is currently above horizon compute when it will set
-            if alt > 0:
-                # Create a time grid (1000 steps within 24h)
-                delta_hours = np.linspace(0, 24, 1000) * u.hour
-                future_times = self.observation_time + delta_hours
-                future_altaz = sky_coord.transform_to(
-                    AltAz(obstime=future_times, location=self.location)
-                )
-                future_alts = future_altaz.alt.deg
-                # Find first time when altitude goes non-positive (object sets)
-                set_indices = np.where(future_alts <= 0)[0]
-                if set_indices.size > 0:
-                    t_set = (
-                        (future_times[set_indices[0]] - self.observation_time)
-                        .to(u.hour)
-                        .value
-                    )
-                    times_to_set.append(t_set)
-                    if t_set < shortest_time:
-                        shortest_time = t_set
-                        first_index = i  # type: ignore
-                else:
-                    times_to_set.append(np.inf)
-            else:
-                times_to_set.append(np.inf)
+        # Transform all bodies at once using an array-valued SkyCoord.
+        sky_coords = SkyCoord(
+            ra=self.df["RA"].to_numpy() * u.deg, dec=self.df["Dec"].to_numpy() * u.deg
+        )
+        altaz = sky_coords.transform_to(self.altaz_frame)
+        altitudes = np.asarray(altaz.alt.deg)
+        azimuths = np.asarray(altaz.az.deg)
+        observables = self.are_observable(altitudes)
+
+        # Only bodies above the horizon can set, so only those are broadcast
+        # (N, 1) against the times (1, 1000), yielding an (N, 1000) altitude grid
+        # from a single transform. The astrometric context is interpolated every
+        # 300s instead of being computed for each of the times, which is far
+        # below the precision needed to find a horizon crossing.
+        with erfa_astrom.set(ErfaAstromInterpolator(300 * u.s)):
+            future_altaz = sky_coords[observables, None].transform_to(
+                self.time_grid_frame
+            )
+        # First time when altitude goes non-positive (object sets).
+        sets = np.asarray(future_altaz.alt.deg) <= 0
+        times_to_set = np.full(len(altitudes), np.inf)
+        times_to_set[observables] = np.where(
+            sets.any(axis=1),
+            self.time_grid[np.argmax(sets, axis=1)].to(u.hour).value,
+            np.inf,
+        )
 
-        self.df["Altitude"] = altitudes
-        self.df["Azimuth"] = azimuths
-        self.df["TimeToSet"] = times_to_set
-        self.df["Observable"] = observables
+        # Single precision is ample for positions used for display and the tour.
+        self.df = self.df.assign(
+            Altitude=altitudes.astype(np.float32),
+            Azimuth=azimuths.astype(np.float32),
+            TimeToSet=times_to_set,
+            Observable=observables,
+        )
 
-        return first_index
+        if not np.isfinite(times_to_set).any():
+            return -1
+        return int(np.argmin(times_to_set))
 
     @staticmethod
-    def is_observable(altaz_coord, min_altitude=0) -> bool:
-        """Return True if the altitude is above min_altitude (default=0 deg)."""
-        return altaz_coord.alt.deg > min_altitude
+    def is_observable(altaz_coord, min_altitude=0) -> np.bool_ | np.ndarray:
+        """
+        Return True if the altitude is above min_altitude (default=0 deg).
+        For an array-valued coordinate, a boolean mask is returned instead.
+        """
+        return CelestialTSP.are_observable(altaz_coord.alt.deg, min_altitude)
+
+    @staticmethod
+    def are_observable(alt_deg, min_altitude=0) -> np.ndarray:
+        """Return a boolean mask of the altitudes (in deg) above min_altitude (default=0 deg)."""
+        return np.asarray(alt_deg) > min_altitude
+
+    @staticmethod
+    def angular_distance_matrix(lat_deg: np.ndarray, lon_deg: np.ndarray) -> np.ndarray:
+        """
+        Returns the matrix of great-circle distances (in degrees) between points given by
+        latitude-like (Altitude/Dec) and longitude-like (Azimuth/RA) angles in degrees.
+        The matrix keeps the floating point precision of the inputs (float32 or float64).
+        """
+        lat_deg, lon_deg = np.asarray(lat_deg), np.asarray(lon_deg)
+        dtype = np.result_type(lat_deg, lon_deg, np.float32)
+        lat = np.deg2rad(lat_deg.astype(dtype, copy=False))
+        lon = np.deg2rad(lon_deg.astype(dtype, copy=False))
+        # Unit vectors in one contiguous (N, 3) array of the input precision.
+        vecs = np.empty((len(lat), 3), dtype=dtype)
+        cos_lat = np.cos(lat)
+        np.multiply(cos_lat, np.cos(lon), out=vecs[:, 0])
+        np.multiply(cos_lat, np.sin(lon), out=vecs[:, 1])
+        np.sin(lat, out=vecs[:, 2])
+        # The chord length between unit vectors gives the angle as 2*arcsin(chord/2),
+        # which unlike arccos of the dot product stays accurate for close pairs.
+        chords = pdist(vecs)
+        angles = np.rad2deg(2 * np.arcsin(np.clip(chords / 2, 0, 1)))
+        return squareform(angles.astype(dtype, copy=False))
 
     @staticmethod
     def make_graph(coordinates: np.ndarray, dist_matrix: np.ndarray) -> nx.Graph:
@@ -169,32 +385,70 @@ class CelestialTSP:
         Node positions (for plotting) are stored in the 'pos' attribute; edge weights are from distance matrix.
         """
         G: nx.Graph = nx.Graph()
-        n = len(coordinates)
-        for i in range(n):
-            G.add_node(i, pos=(coordinates[i][0], coordinates[i][1]))
-        # Use upper-triangle of matrix (graph undirected)
-        for i in range(n):
-            for j in range(i + 1, n):
-                G.add_edge(i, j, weight=dist_matrix[i, j])
+        G.add_nodes_from(
+            (i, {"pos": (x, y)}) for i, (x, y) in enumerate(np.asarray(coordinates))
+        )
+        CelestialTSP._add_distance_edges(G, dist_matrix)
         return G
 
+    @staticmethod
+    def _add_distance_edges(G: nx.Graph, dist_matrix: np.ndarray) -> None:
+        """Adds an edge between every pair of nodes, weighted by the distance matrix."""
+        # Use upper-triangle of matrix (graph undirected). Unlike nx.from_numpy_array,
+        # this keeps zero-weight edges, so coincident bodies stay connected.
+        rows, cols = np.triu_indices(len(dist_matrix), k=1)
+        G.add_weighted_edges_from(
+            zip(rows.tolist(), cols.tolist(), np.asarray(dist_matrix)[rows, cols])
+        )
+
+    @staticmethod
+    def solve_tsp(dist_matrix: np.ndarray, source: int) -> list[int]:
+        """
+        Finds a short tour over all celestial bodies with the Christofides algorithm.
+        Only the (metric) distance matrix is needed; the graph Christofides works on
+        is internal. Returns the visiting order as a cycle that starts and ends at source.
+        """
+        n = len(dist_matrix)
+        if n < 2:
+            return [source, source]
+        G: nx.Graph = nx.Graph()
+        G.add_nodes_from(range(n))
+        CelestialTSP._add_distance_edges(G, dist_matrix)
+        # Rotate the closed cycle so that it starts at source.
+        cycle = nx.approximation.christofides(G)
+        k = cycle.index(source)
+        return cycle[k:-1] + cycle[:k] + [source]
+
     @staticmethod
     def show_results(df: pd.DataFrame) -> None:
         """Prints the optimal order of celestial bodies."""
         print("\nOptimal Order of Celestial Bodies:")
-        for i, row in df.iterrows():
-            if int(i) + 1 == len(df):  # type: ignore
-                continue
-            name = row["Name"]
-            ra = f"{row['RA']:.2f}"
-            dec = f"{row['Dec']:.2f}"
-            alt = f"{row['Altitude']:.2f}"
-            azimuth = f"{row['Azimuth']:.2f}"
-            tset = f"{row['TimeToSet']:.2f}"
-            observable = row["Observable"]
-            print(
-                f"Name: {name:<10} RA: {ra:<7} Dec: {dec:<7} Altitude: {alt:<7} Azimuth: {azimuth:<7} Time to set: {tset:<7} Observable: {observable}"
-            )
+        # The last row closes the tour back to the first body, so it is skipped.
+        # Each column is formatted and padded as a whole, then joined into lines.
+        shown = df.iloc[:-1]
+        if shown.empty:
+            return
+
+        def fixed(column: str) -> pd.Series:
+            return shown[column].map("{:.2f}".format).str.ljust(7)
+
+        lines = (
+            "Name: "
+            + shown["Name"].astype(str).str.ljust(10)
+            + " RA: "
+            + fixed("RA")
+            + " Dec: "
+            + fixed("Dec")
+            + " Altitude: "
+            + fixed("Altitude")
+            + " Azimuth: "
+            + fixed("Azimuth")
+            + " Time to set: "
+            + fixed("TimeToSet")
+            + " Observable: "
+            + shown["Observable"].astype(str)
+        )
+        print("\n".join(lines))
 
     @staticmethod
     def save_spherical_image(
@@ -207,22 +461,21 @@ class CelestialTSP:
         fig = plt.figure(figsize=(8, 8))
         ax = cast(PolarAxes, fig.add_subplot(111, projection="polar"))
 
-        az_radians = np.deg2rad(df["Azimuth"])
-        alt_radians = np.deg2rad(90 - df["Altitude"])
+        az_radians = np.deg2rad(df["Azimuth"].to_numpy())
+        alt_radians = np.deg2rad(90 - df["Altitude"].to_numpy())
+        names = df["Name"].to_numpy()
 
         ax.scatter(az_radians, alt_radians, c="blue", label="Celestial Bodies")
-        for i, row in df.iterrows():
-            ax.annotate(
-                row["Name"], (az_radians[i], alt_radians[i]), fontsize=8, ha="right"
-            )
+        for name, az, alt in zip(names, az_radians, alt_radians):
+            ax.annotate(name, (az, alt), fontsize=8, ha="right")
 
-        for i in range(len(df) - 1):
-            start_az, start_alt = az_radians[i], alt_radians[i]
-            end_az, end_alt = az_radians[i + 1], alt_radians[i + 1]
-            ax.plot([start_az, end_az], [start_alt, end_alt], "r-")
+        # Draw the whole path as one artist: segment i joins body i and body i + 1.
+        points = np.column_stack((az_radians, alt_radians))
+        segments = np.stack((points[:-1], points[1:]), axis=1)
+        ax.add_collection(LineCollection(list(segments), colors="red"))
 
         if len(df) > 0:
-            start_az, start_alt = az_radians.iloc[0], alt_radians.iloc[0]
+            start_az, start_alt = az_radians[0], alt_radians[0]
             ax.annotate(
                 "Start",
                 xy=(start_az, start_alt),
@@ -232,7 +485,7 @@ class CelestialTSP:
                 ha="center",
             )
             if len(df) > 1:
-                second_az, second_alt = az_radians.iloc[1], alt_radians.iloc[1]
+                second_az, second_alt = az_radians[1], alt_radians[1]
                 ax.annotate(
                     "",
                     xy=(second_az, second_alt),
@@ -266,19 +519,39 @@ class CelestialTSP:
     def get_location() -> tuple:
         """
         Obtain the current location by using ip-api.com.
+        The location is cached in CACHE_DIR for LOCATION_CACHE_TTL seconds.
         Returns a tuple (latitude, longitude) or (None, None) if unavailable.
         """
+        cache_path = os.path.join(CACHE_DIR, "location.json")
         try:
-            response = requests.get("http://ip-api.com/json/")
+            with open(cache_path, "r") as f:
+                cached = json.load(f)
+            if time.time() - cached["timestamp"] < LOCATION_CACHE_TTL:
+                return float(cached["lat"]), float(cached["lon"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        try:
+            response = requests.get("http://ip-api.com/json/", timeout=1.5)
             data = response.json()
             if data.get("status") == "success":
-                return float(data.get("lat")), float(data.get("lon"))
+                latitude, longitude = float(data.get("lat")), float(data.get("lon"))
             else:
                 print("Error: Unable to get location data")
                 return None, None
         except Exception:
             return None, None
 
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(cache_path, "w") as f:
+                json.dump(
+                    {"lat": latitude, "lon": longitude, "timestamp": time.time()}, f
+                )
+        except OSError:
+            pass
+        return latitude, longitude
+
     @classmethod
     def build_arg_parser(cls) -> argparse.Namespace:
         """
@@ -345,6 +618,10 @@ class CelestialTSP:
 
 
 def main():
+    # Plots are only saved to files, so use the non-interactive Agg backend
+    # unless a backend was chosen explicitly.
+    if "MPLBACKEND" not in os.environ:
+        matplotlib.use("Agg")
     # Parse command line arguments
     args = CelestialTSP.build_arg_parser()
     # Create and run the CelestialTSP planner
@@ -4,6 +4,7 @@
 import argparse
 import datetime
 import io
+import itertools
 import os
 import sys
 import tempfile
@@ -22,6 +23,7 @@ import astropy.units as u
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
 # Import the module under test
+import celestsp.main
 from celestsp.main import CelestialTSP, main
 
 
@@ -36,36 +38,25 @@ class DummyAltAz:
 # A dummy version of SkyCoord.transform_to.
 def dummy_transform_to(self, frame):
     """
-    This dummy inspects self.ra.deg: if it is less than 1 then returns an altitude of 10,
-    otherwise returns an altitude of 5.
+    This dummy inspects self.ra.deg: where it is less than 1 the altitude is 10,
+    otherwise the altitude is 5.
     For vectorized calls (when frame.obstime is an array) the altitude will linearly decrease
     from the chosen value to below 0 so that the first time a set condition is met can be computed.
+    The result broadcasts the shape of self against the shape of frame.obstime.
     """
-    dummy_alt = 10.0 if self.ra.deg < 1.0 else 5.0
-    # If the frame has an "obstime" attribute, check if it is array-like.
-    if hasattr(frame, "obstime"):
-        try:
-            # if frame.obstime is iterable (vectorized call)
-            n = len(frame.obstime)
-        except TypeError:
-            n = None
-        if n is not None:
-            # Create a linearly decreasing altitude array:
-            # altitude will drop from dummy_alt at t=0 to -1 at t=end.
-            alts = dummy_alt - (dummy_alt + 1) * np.linspace(0, 1, n)
-            dummy_alt_obj = type("DummyAltArray", (), {})()
-            dummy_alt_obj.deg = alts
-            dummy_az_obj = type("DummyAzArray", (), {})()
-            dummy_az_obj.deg = np.full(n, 100.0)
-            dummy = type("Dummy", (), {})()
-            dummy.alt = dummy_alt_obj
-            dummy.az = dummy_az_obj
-            return dummy
-        else:
-            # Scalar call: return a constant dummy object.
-            return DummyAltAz(dummy_alt)
+    dummy_alt = np.where(np.asarray(self.ra.deg) < 1.0, 10.0, 5.0)
+    obstime_shape = np.shape(getattr(frame, "obstime", None))
+    if obstime_shape:
+        # Create a linearly decreasing altitude array:
+        # altitude will drop from dummy_alt at t=0 to -1 at t=end.
+        fraction = np.linspace(0, 1, obstime_shape[-1]).reshape(obstime_shape)
+        alts = dummy_alt - (dummy_alt + 1) * fraction
     else:
-        return DummyAltAz(dummy_alt)
+        alts = dummy_alt
+    dummy = type("Dummy", (), {})()
+    dummy.alt = type("DummyAltArray", (), {"deg": alts})
+    dummy.az = type("DummyAzArray", (), {"deg": np.full(np.shape(alts), 100.0)})
+    return dummy
 
 
 # A dummy version of SkyCoord.from_name for testing read_celestial_names.
@@ -84,14 +75,14 @@ def dummy_from_name(name):
 
 
 # A dummy requests.get to simulate get_location.
-def dummy_requests_get_success(url):
+def dummy_requests_get_success(url, **kwargs):
     # Simulate a successful response.
     response = MagicMock()
     response.json.return_value = {"status": "success", "lat": 35.0, "lon": -120.0}
     return response
 
 
-def dummy_requests_get_fail(url):
+def dummy_requests_get_fail(url, **kwargs):
     # Simulate a failed location response.
     response = MagicMock()
     response.json.return_value = {"status": "fail"}
@@ -100,41 +91,46 @@ def dummy_requests_get_fail(url):
 
 # --- The test class --- #
 class TestCelestialTSP(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # A single temporary directory holds the input file, the caches and the
+        # plots of all tests, and is removed with everything in it at the end.
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.input_path = os.path.join(cls._tmp.name, "input.txt")
+        with open(cls.input_path, "w", encoding="utf-8") as f:
+            # Write some dummy celestial names (each name on its own line).
+            # We choose names that when passed to dummy_from_name produce specific RA/Dec values.
+            f.write(
+                "0\n1\nNonNumeric"
+            )  # first two numeric, third will use default 15.0.
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
     def setUp(self):
-        # Create dummy arguments similar to build_arg_parser but overriding defaults.
-        self.temp_input = tempfile.NamedTemporaryFile(
-            delete=False, mode="w", encoding="utf-8"
+        # Keep the on-disk caches out of the user's cache directory, one per test.
+        cache_patcher = patch(
+            "celestsp.main.CACHE_DIR", os.path.join(self._tmp.name, "cache", self.id())
         )
-        # Write some dummy celestial names (each name on its own line).
-        # We choose names that when passed to dummy_from_name produce specific RA/Dec values.
-        self.temp_input.write(
-            "0\n1\nNonNumeric"
-        )  # first two numeric, third will use default 15.0.
-        self.temp_input.close()
-        # Build a dummy argparse.Namespace
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+        # Create dummy arguments similar to build_arg_parser but overriding defaults.
         self.args = argparse.Namespace(
-            input_file_path=self.temp_input.name,
+            input_file_path=self.input_path,
             lat=0.0,
             lon=0.0,
             height=0.0,
             date="2023-01-01",
             time="00:00:00",
             tz="+0",
-            output="test_output",
+            output=os.path.join(self._tmp.name, "test_output"),
             first_body="",
             default_datetime=False,
         )
         # Create a CelestialTSP instance with dummy args.
         self.planner = CelestialTSP(self.args)
 
-    def tearDown(self):
-        if os.path.exists(self.temp_input.name):
-            os.unlink(self.temp_input.name)
-        # Remove any files created by save_spherical_image if necessary.
-        for f in os.listdir("."):
-            if f.startswith(self.args.output) and f.endswith(".png"):
-                os.unlink(f)
-
     @patch("celestsp.main.SkyCoord.from_name", side_effect=dummy_from_name)
     def test_read_celestial_names_success(self, mock_from_name):
         # Test that read_celestial_names returns a DataFrame with valid data.
@@ -146,6 +142,107 @@ class TestCelestialTSP(unittest.TestCase):
         # Three lines in our file.
         self.assertEqual(len(df), 3)
 
+    @patch("celestsp.main.SkyCoord.from_name", side_effect=dummy_from_name)
+    def test_read_celestial_names_cached(self, mock_from_name):
+        # Names resolved once are served from the name cache on the next read.
+        df = self.planner.read_celestial_names(self.args.input_file_path)
+        self.assertEqual(mock_from_name.call_count, 3)
+        # A second file with the same names bypasses the cache of parsed inputs.
+        path = os.path.join(self._tmp.name, "same_names.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("0\n1\nNonNumeric")
+        cached_df = self.planner.read_celestial_names(path)
+        self.assertEqual(mock_from_name.call_count, 3)
+        pd.testing.assert_frame_equal(df, cached_df)
+
+    @patch("celestsp.main.SkyCoord.from_name", side_effect=dummy_from_name)
+    def test_read_celestial_names_unchanged_file(self, mock_from_name):
+        # An unchanged input file is not parsed again.
+        df = self.planner.read_celestial_names(self.args.input_file_path)
+        with patch.object(CelestialTSP, "lookup_names") as mock_lookup:
+            cached_df = self.planner.read_celestial_names(self.args.input_file_path)
+        mock_lookup.assert_not_called()
+        pd.testing.assert_frame_equal(df, cached_df)
+        # A modified input file is read again.
+        path = os.path.join(self._tmp.name, "modified.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("0\n")
+        self.planner.read_celestial_names(path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("1\n")
+        df = self.planner.read_celestial_names(path)
+        self.assertEqual(list(df["Name"]), ["0", "1"])
+
+    @patch("celestsp.main.SkyCoord.from_name", side_effect=dummy_from_name)
+    def test_read_celestial_names_modified_during_lookup(self, mock_from_name):
+        # An edit made while the names are looked up must not be hidden by the cache.
+        path = os.path.join(self._tmp.name, "edited.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("0\n")
+        lookup_names = CelestialTSP.lookup_names
+
+        def lookup_and_edit(names):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("1\n")
+            return lookup_names(names)
+
+        with patch.object(CelestialTSP, "lookup_names", side_effect=lookup_and_edit):
+            df = self.planner.read_celestial_names(path)
+        self.assertEqual(list(df["Name"]), ["0"])
+        df = self.planner.read_celestial_names(path)
+        self.assertEqual(list(df["Name"]), ["0", "1"])
+
+    @patch("celestsp.main.SkyCoord.from_name", side_effect=dummy_from_name)
+    def test_read_celestial_names_corrupt_cache(self, mock_from_name):
+        # Cache entries that cannot be read or have the wrong shape are misses.
+        df = self.planner.read_celestial_names(self.args.input_file_path)
+        cache_dir = os.path.join(celestsp.main.CACHE_DIR, "inputs")
+        (entry,) = os.listdir(cache_dir)
+        for content in ["5", "null", "{not json", '{"names": 5}']:
+            with open(os.path.join(cache_dir, entry), "w", encoding="utf-8") as f:
+                f.write(content)
+            cached_df = self.planner.read_celestial_names(self.args.input_file_path)
+            pd.testing.assert_frame_equal(df, cached_df)
+
+    @patch("celestsp.main.SkyCoord.from_name", side_effect=dummy_from_name)
+    def test_read_celestial_names_cache_pruned(self, mock_from_name):
+        # Only the most recently written input files are kept in the cache.
+        with patch("celestsp.main.INPUT_CACHE_MAX_ENTRIES", 2):
+            for i in range(3):
+                path = os.path.join(self._tmp.name, f"pruned_{i}.txt")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(f"{i}\n")
+                self.planner.read_celestial_names(path)
+        cache_dir = os.path.join(celestsp.main.CACHE_DIR, "inputs")
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    @patch("celestsp.main.SkyCoord.from_name", side_effect=dummy_from_name)
+    def test_read_celestial_names_coordinates(self, mock_from_name):
+        # "RA Dec" lines are used directly without looking them up.
+        path = os.path.join(self._tmp.name, "coordinates.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("10.68 41.27\n83.63, 22.01\nNonNumeric\n")
+        df = self.planner.read_celestial_names(path)
+        mock_from_name.assert_called_once_with("NonNumeric")
+        np.testing.assert_allclose(df["RA"], [10.68, 83.63, 15.0], rtol=1e-6)
+        np.testing.assert_allclose(df["Dec"], [41.27, 22.01, 7.5], rtol=1e-6)
+
+    def test_read_celestial_names_lookup_error(self):
+        # Names that cannot be resolved are reported and skipped.
+        def from_name(name):
+            if name == "NonNumeric":
+                raise ValueError("unknown object")
+            return dummy_from_name(name)
+
+        out = io.StringIO()
+        with (
+            patch("celestsp.main.SkyCoord.from_name", side_effect=from_name),
+            redirect_stdout(out),
+        ):
+            df = self.planner.read_celestial_names(self.args.input_file_path)
+        self.assertEqual(list(df["Name"]), ["0", "1"])
+        self.assertIn("Error looking up NonNumeric: unknown object", out.getvalue())
+
     def test_read_celestial_names_file_not_exist(self):
         # Provide a non-existent file path.
         fake_path = "nonexistent_file.txt"
@@ -159,23 +256,30 @@ class TestCelestialTSP(unittest.TestCase):
 
     @patch("celestsp.main.SkyCoord.from_name", side_effect=dummy_from_name)
     def test_read_celestial_names_empty(self, mock_from_name):
-        # Create an empty temporary file.
-        with tempfile.NamedTemporaryFile(
-            delete=False, mode="w", encoding="utf-8"
-        ) as tmp:
-            empty_path = tmp.name
-        try:
-            with (
-                self.assertRaises(SystemExit) as cm,
-                patch("sys.stdout", new=io.StringIO()) as fake_out,
-            ):
-                self.planner.read_celestial_names(empty_path)
-            self.assertEqual(cm.exception.code, 1)
-            self.assertIn(
-                "empty or contains no valid celestial names", fake_out.getvalue()
-            )
-        finally:
-            os.unlink(empty_path)
+        # Create an empty file.
+        empty_path = os.path.join(self._tmp.name, "empty.txt")
+        open(empty_path, "w").close()
+        with (
+            self.assertRaises(SystemExit) as cm,
+            patch("sys.stdout", new=io.StringIO()) as fake_out,
+        ):
+            self.planner.read_celestial_names(empty_path)
+        self.assertEqual(cm.exception.code, 1)
+        self.assertIn("empty or contains no valid celestial names", fake_out.getvalue())
+
+    @patch("celestsp.main.SkyCoord.from_name", side_effect=dummy_from_name)
+    @patch("celestsp.main.SkyCoord.transform_to", new=dummy_transform_to)
+    def test_find_first_body(self, mock_from_name):
+        self.planner.df = self.planner.read_celestial_names(self.args.input_file_path)
+        first_index = self.planner.find_first_body()
+        # Rows with RA >= 1 start lower (altitude 5) and therefore set first.
+        self.assertEqual(first_index, 1)
+        for column in ["Altitude", "Azimuth", "TimeToSet", "Observable"]:
+            self.assertIn(column, self.planner.df.columns)
+        self.assertTrue(self.planner.df["Observable"].all())
+        self.assertLess(
+            self.planner.df["TimeToSet"].iloc[1], self.planner.df["TimeToSet"].iloc[0]
+        )
 
     def test_is_observable(self):
         # Create a dummy altaz object with alt.deg = 5.
@@ -187,6 +291,35 @@ class TestCelestialTSP(unittest.TestCase):
         # Test with min_altitude argument.
         self.assertFalse(CelestialTSP.is_observable(dummy, min_altitude=6))
 
+    def test_are_observable(self):
+        alts = np.array([5.0, -1.0, 0.0, 6.5])
+        np.testing.assert_array_equal(
+            CelestialTSP.are_observable(alts), [True, False, False, True]
+        )
+        np.testing.assert_array_equal(
+            CelestialTSP.are_observable(alts, min_altitude=6),
+            [False, False, False, True],
+        )
+
+    def test_angular_distance_matrix(self):
+        alt = np.array([0.0, 0.0, 90.0, 0.0])
+        az = np.array([1.0, 359.0, 0.0, 91.0])
+        dmatrix = CelestialTSP.angular_distance_matrix(alt, az)
+        self.assertEqual(dmatrix.shape, (4, 4))
+        np.testing.assert_allclose(np.diag(dmatrix), 0.0)
+        np.testing.assert_allclose(dmatrix, dmatrix.T)
+        # Azimuth wraps around north.
+        self.assertAlmostEqual(dmatrix[0, 1], 2.0)
+        # The zenith is 90 degrees away from any point on the horizon.
+        self.assertAlmostEqual(dmatrix[0, 2], 90.0)
+        self.assertAlmostEqual(dmatrix[0, 3], 90.0)
+        # Single precision inputs give a single precision matrix.
+        dmatrix32 = CelestialTSP.angular_distance_matrix(
+            alt.astype(np.float32), az.astype(np.float32)
+        )
+        self.assertEqual(dmatrix32.dtype, np.float32)
+        np.testing.assert_allclose(dmatrix32, dmatrix, atol=1e-4)
+
     def test_make_graph(self):
         # Prepare simple coordinates and distance matrix.
         coords = np.array([[10, 20], [30, 40], [50, 60]])
@@ -197,6 +330,31 @@ class TestCelestialTSP(unittest.TestCase):
         self.assertEqual(len(graph.nodes), 3)
         self.assertEqual(len(graph.edges), 3)  # complete graph of 3 nodes: 3 edges.
         self.assertAlmostEqual(graph[0][1]["weight"], 1)
+        self.assertEqual(graph.nodes[2]["pos"], (50, 60))
+        # Zero distances (coincident bodies) must still be edges.
+        graph = CelestialTSP.make_graph(coords, np.zeros((3, 3)))
+        self.assertEqual(len(graph.edges), 3)
+
+    def test_solve_tsp(self):
+        # Four corners of a square: the optimal tour walks around the edges.
+        dist_mat = np.array(
+            [
+                [0.0, 1.0, 1.4, 1.0],
+                [1.0, 0.0, 1.0, 1.4],
+                [1.4, 1.0, 0.0, 1.0],
+                [1.0, 1.4, 1.0, 0.0],
+            ],
+            dtype=np.float32,
+        )
+        tour = CelestialTSP.solve_tsp(dist_mat, 2)
+        self.assertEqual(tour[0], 2)
+        self.assertEqual(tour[-1], 2)
+        self.assertEqual(sorted(tour[:-1]), [0, 1, 2, 3])
+        self.assertAlmostEqual(
+            sum(dist_mat[a, b] for a, b in itertools.pairwise(tour)), 4.0, places=5
+        )
+        # A single body is a trivial tour.
+        self.assertEqual(CelestialTSP.solve_tsp(np.zeros((1, 1)), 0), [0, 0])
 
     def test_show_results(self):
         # Create a dummy DataFrame with required columns.
@@ -261,11 +419,27 @@ class TestCelestialTSP(unittest.TestCase):
             self.assertIsNone(lat)
             self.assertIsNone(lon)
 
+    def test_get_location_cached(self):
+        with patch(
+            "celestsp.main.requests.get", side_effect=dummy_requests_get_success
+        ) as mock_get:
+            self.assertEqual(CelestialTSP.get_location(), (35.0, -120.0))
+            # A second call within the TTL is served from the cache.
+            self.assertEqual(CelestialTSP.get_location(), (35.0, -120.0))
+            self.assertEqual(mock_get.call_count, 1)
+        # Once the cached location expires, ip-api.com is queried again.
+        with (
+            patch("celestsp.main.LOCATION_CACHE_TTL", 0),
+            patch("celestsp.main.requests.get", side_effect=dummy_requests_get_fail),
+            patch("sys.stdout", new=io.StringIO()),
+        ):
+            self.assertEqual(CelestialTSP.get_location(), (None, None))
+
     def test_build_arg_parser(self):
         # To make sure build_arg_parser returns the expected Namespace,
         # we simulate a command-line call by patching sys.argv.
         args_list = [
-            self.temp_input.name,
+            self.input_path,
             "--lat",
             "12.34",
             "--lon",
@@ -288,7 +462,7 @@ class TestCelestialTSP(unittest.TestCase):
                 "celestsp.main.CelestialTSP.get_location", return_value=(1.0, 2.0)
             ):
                 parser_args = CelestialTSP.build_arg_parser()
-                self.assertEqual(parser_args.input_file_path, self.temp_input.name)
+                self.assertEqual(parser_args.input_file_path, self.input_path)
                 self.assertEqual(parser_args.lat, 12.34)
                 self.assertEqual(parser_args.lon, 56.78)
                 self.assertEqual(parser_args.height, 100)
@@ -300,8 +474,7 @@ class TestCelestialTSP(unittest.TestCase):
 
     @patch("celestsp.main.SkyCoord.from_name", side_effect=dummy_from_name)
     @patch("celestsp.main.SkyCoord.transform_to", new=dummy_transform_to)
-    @patch("celestsp.main.nx.approximation.greedy_tsp", return_value=[1, 0, 2])
-    def test_run_with_first_body_not_specified(self, mock_tsp, mock_from_name):
+    def test_run_with_first_body_not_specified(self, mock_from_name):
         # Test the full run() method when first_body is not provided.
         # First, read celestial names.
         self.planner.df = self.planner.read_celestial_names(self.args.input_file_path)
@@ -319,6 +492,9 @@ class TestCelestialTSP(unittest.TestCase):
         printed = out.getvalue()
         self.assertIn("Location:", printed)
         self.assertIn("Observation Date/Time:", printed)
+        # The tour must start at the first body.
+        results = printed.split("Optimal Order of Celestial Bodies:")[1].splitlines()
+        self.assertTrue(results[1].startswith("Name: 1 "))
         # Because all plotting and file saving functions are exercised, check that the output contains the plot saved message.
         self.assertIn("Plot saved as", printed)
 
@@ -356,9 +532,23 @@ class TestMainFunction(unittest.TestCase):
         )
         mock_build_arg_parser.return_value = dummy_args
         # Run main() and make sure run() is called.
-        with patch("sys.stdout", new=io.StringIO()):
+        with (
+            patch("sys.stdout", new=io.StringIO()),
+            patch.dict(os.environ),
+            patch("celestsp.main.matplotlib.use") as mock_use,
+        ):
+            os.environ.pop("MPLBACKEND", None)
             main()
             mock_run.assert_called()
+            mock_use.assert_called_once_with("Agg")
+        # An explicitly chosen backend is left alone.
+        with (
+            patch("sys.stdout", new=io.StringIO()),
+            patch.dict(os.environ, {"MPLBACKEND": "svg"}),
+            patch("celestsp.main.matplotlib.use") as mock_use,
+        ):
+            main()
+            mock_use.assert_not_called()
 
 
 if __name__ == "__main__":